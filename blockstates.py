@@ -0,0 +1,74 @@
+from typing import Dict, List, Any, FrozenSet, Optional, Tuple
+
+
+class BlockStateSchemas:
+    """Tabela de esquemas de propriedades de blocos, com esquemas idênticos internados.
+
+    Um esquema é o conjunto ordenado de pares 'propriedade=valor' de um bloco. Blocos com o
+    mesmo esquema (escadas, lajes, cercas...) compartilham a mesma entrada da tabela. O formato
+    serializado é {'schemas': [[pares]], 'formats': [formato], 'blocks': {'modid:id': índice}}.
+
+    O formato ('variants' ou 'multipart') indica de onde o esquema veio: um esquema multipart
+    só lista os valores citados nas condições 'when', então não é a lista completa de estados.
+    """
+
+    def __init__(self, data: Optional[Dict[str, Any]] = None):
+        data = data or {}
+        self.schemas: List[List[str]] = data.get('schemas', [])
+        self.formats: List[str] = data.get('formats', ['variants'] * len(self.schemas))
+        self.blocks: Dict[str, int] = data.get('blocks', {})
+        self._ids = {(self.formats[i], tuple(schema)): i for i, schema in enumerate(self.schemas)}
+        self._sets: Dict[int, FrozenSet[str]] = {}
+
+    def intern(self, full_id: str, variant_info: Dict[str, List[str]], blockstate_format: str = 'variants') -> int:
+        """Registra o esquema de um bloco, reaproveitando um esquema idêntico já existente."""
+        schema = tuple(sorted(f"{key}={value}" for key, values in variant_info.items() for value in values))
+        key = (blockstate_format, schema)
+        schema_id = self._ids.get(key)
+        if schema_id is None:
+            schema_id = len(self.schemas)
+            self.schemas.append(list(schema))
+            self.formats.append(blockstate_format)
+            self._ids[key] = schema_id
+        self.blocks[full_id] = schema_id
+        return schema_id
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Formato serializado da tabela."""
+        return {'schemas': self.schemas, 'formats': self.formats, 'blocks': self.blocks}
+
+    def schema_set(self, schema_id: int) -> FrozenSet[str]:
+        """Conjunto de pares de um esquema, calculado uma única vez por esquema."""
+        if schema_id not in self._sets:
+            self._sets[schema_id] = frozenset(self.schemas[schema_id])
+        return self._sets[schema_id]
+
+    def diff(self, other: 'BlockStateSchemas', full_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Pares propriedade=valor que cada bloco tem aqui e não tem em `other`.
+
+        Retorna {'modid:id': {'lost_states': {prop: [valores]}, 'verified': bool}}. Perdas contra
+        um esquema multipart de `other` não são verificáveis e saem com 'verified' falso.
+        A diferença é memorizada por par de esquemas, então blocos que compartilham
+        esquemas nos dois packs custam apenas uma consulta ao dicionário.
+        """
+        cache: Dict[Tuple[int, int], Dict[str, List[str]]] = {}
+        lost_states = {}
+        for full_id in full_ids:
+            origin_id = self.blocks.get(full_id)
+            final_id = other.blocks.get(full_id)
+            if origin_id is None or final_id is None:
+                continue
+
+            key = (origin_id, final_id)
+            if key not in cache:
+                lost = {}
+                for pair in sorted(self.schema_set(origin_id) - other.schema_set(final_id)):
+                    prop, _, value = pair.partition('=')
+                    lost.setdefault(prop, []).append(value)
+                cache[key] = lost
+            if cache[key]:
+                lost_states[full_id] = {
+                    'lost_states': cache[key],
+                    'verified': other.formats[final_id] != 'multipart'
+                }
+        return lost_states
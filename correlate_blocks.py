@@ -1,7 +1,11 @@
 import difflib
+import heapq
 from visualization import BlockVisualizer
 from typing import Dict, List, Any, Optional, Tuple
 from utils import load_json, save_file, bool_input, int_range_input, read_config
+from rule_miner import ReplacementRuleMiner
+from textures import TextureIndex
+from tags import TagIndex
 from configparser import ConfigParser
 import os
 
@@ -11,8 +15,20 @@ class BlockReplacer:
         self.visualizer = BlockVisualizer()
         self.existing_blocks = None
         self.missing_blocks = None
+        self.final_catalog = None
+        self.origin_catalog = None
         self.existing_block_ids = []
+        self.candidate_blocks = []
+        self.final_textures = TextureIndex()
+        self.origin_textures = TextureIndex()
+        self.final_tags = TagIndex()
+        self.origin_tags = TagIndex()
+        self.tag_postings = {}
+        self.reference_counts = {}
         self.replacement_mapping = {}
+        self.dismissed = set()
+        self.rule_miner = ReplacementRuleMiner()
+        self.declined_suggestions = set()
         self.progress_file = os.path.join(self.config['output'].BASE, 'replacement_progress.json')
         self.loaded_progress = False
 
@@ -24,26 +40,95 @@ class BlockReplacer:
             'output': Output
         }
 
-    def load_data(self) -> None:
-        """Carrega os dados necessários usando as funções utilitárias."""
+    def load_data(self, final_catalog: Optional[Dict[str, Any]] = None, origin_catalog: Optional[Dict[str, Any]] = None,
+                  missing_blocks: Optional[List[Dict[str, Any]]] = None) -> None:
+        """Carrega os dados necessários usando as funções utilitárias.
+
+        Catálogos e blocos faltantes já em memória (ex.: passados pelo pipeline) são usados
+        diretamente; o que não for informado é lido dos arquivos JSON.
+        """
         output = self.config['output']
+        self.final_catalog = final_catalog or {}
+        self.origin_catalog = origin_catalog or {}
         
         # Carrega blocos existentes e faltantes
-        self.existing_blocks = load_json(os.path.join(output.BASE, output.RC_BLOCKS))
-        self.missing_blocks = load_json(os.path.join(output.BASE, output.MISSING_BLOCKS))
+        self.existing_blocks = self._catalog_entry(self.final_catalog, 'blocks', output.RC_BLOCKS)
+        self.missing_blocks = (missing_blocks if missing_blocks is not None
+                               else load_json(os.path.join(output.BASE, output.MISSING_BLOCKS)))
         
         if not self.existing_blocks or not self.missing_blocks:
             raise ValueError("Não foi possível carregar os dados necessários")
         
         self.existing_block_ids = self._get_all_existing_block_ids()
+        self.candidate_blocks = self._build_candidate_blocks()
+        self._load_texture_indexes()
+        self._load_tag_indexes()
+        self._load_reference_counts()
         self._load_progress()
 
+    def _catalog_entry(self, catalog: Dict[str, Any], key: str, file_name: str) -> Optional[Any]:
+        """Obtém uma parte do catálogo da memória ou, se ausente, do arquivo correspondente."""
+        if catalog.get(key) is not None:
+            return catalog[key]
+        path = os.path.join(self.config['output'].BASE, file_name)
+        return load_json(path) if os.path.exists(path) else None
+
+    def _load_texture_indexes(self) -> None:
+        """Carrega os índices visuais, alinhando o do pack final com a lista de candidatos."""
+        output = self.config['output']
+        final_signatures = self._catalog_entry(self.final_catalog, 'textures', output.RC_TEXTURES)
+        origin_signatures = self._catalog_entry(self.origin_catalog, 'textures', output.DC_TEXTURES)
+
+        keys = [block['full_id'] for block in self.candidate_blocks]
+        self.final_textures = TextureIndex(final_signatures, keys)
+        self.origin_textures = TextureIndex(origin_signatures)
+
+    def _load_tag_indexes(self, max_share: float = 0.1) -> None:
+        """Carrega as tags de blocos dos dois packs e monta a lista invertida dos candidatos.
+
+        Tags que cobrem mais de `max_share` dos candidatos (ex.: mineable/pickaxe) não
+        discriminam nada e ficam fora da lista invertida.
+        """
+        output = self.config['output']
+        final_tags = self._catalog_entry(self.final_catalog, 'tags', output.RC_TAGS)
+        origin_tags = self._catalog_entry(self.origin_catalog, 'tags', output.DC_TAGS)
+        self.final_tags = TagIndex((final_tags or {}).get('blocks'))
+        self.origin_tags = TagIndex((origin_tags or {}).get('blocks'))
+
+        keys = [block['full_id'] for block in self.candidate_blocks]
+        limit = max_share * len(keys)
+        self.tag_postings = {
+            bit: positions for bit, positions in self.final_tags.postings(keys).items()
+            if len(positions) <= limit
+        }
+
+    def _load_reference_counts(self) -> None:
+        """Soma as contagens de referências (receitas, loot tables e KubeJS) dos dois packs."""
+        output = self.config['output']
+        self.reference_counts = {}
+        sources = ((self.origin_catalog, output.DC_REFERENCES), (self.final_catalog, output.RC_REFERENCES))
+        for catalog, file_name in sources:
+            references = self._catalog_entry(catalog, 'references', file_name)
+            for element_id, count in (references or {}).items():
+                self.reference_counts[element_id] = self.reference_counts.get(element_id, 0) + count
+
+    def _tag_candidates(self, missing_block: Dict[str, Any]) -> Optional[List[int]]:
+        """Posições dos candidatos que compartilham alguma tag com o bloco faltante (None = sem filtro)."""
+        origin_mask = self.origin_tags.mask(f"{missing_block['modid']}:{missing_block['id']}")
+        mask = self.origin_tags.translate(origin_mask, self.final_tags)
+
+        positions = set()
+        for bit in TagIndex.bits(mask):
+            positions.update(self.tag_postings.get(bit, []))
+        return sorted(positions) if positions else None
+
     def _load_progress(self) -> None:
         """Carrega o progresso anterior se existir."""
         if os.path.exists(self.progress_file):
             progress = load_json(self.progress_file)
             if progress:
                 self.replacement_mapping = progress.get('mapping', {})
+                self.dismissed = set(progress.get('dismissed', []))
                 self.loaded_progress = True
                 print(f"\nProgresso anterior carregado. {len(self.replacement_mapping)} substituições já feitas.")
 
@@ -51,8 +136,9 @@ class BlockReplacer:
         """Salva o progresso atual."""
         progress_data = {
             'mapping': self.replacement_mapping,
+            'dismissed': sorted(self.dismissed),
             'remaining': [block for block in self.missing_blocks 
-                            if f"{block['modid']}:{block['id']}" not in self.replacement_mapping]
+                            if not self._is_resolved(block)]
         }
         save_file(
             base=self.config['output'].BASE,
@@ -60,6 +146,11 @@ class BlockReplacer:
             file_path='replacement_progress.json'
         )
 
+    def _is_resolved(self, block: Dict[str, Any]) -> bool:
+        """Indica se o bloco faltante já tem substituto ou foi dispensado."""
+        full_id = f"{block['modid']}:{block['id']}"
+        return full_id in self.replacement_mapping or full_id in self.dismissed
+
     def _get_all_existing_block_ids(self) -> List[str]:
         """Obtém todos os IDs de blocos existentes."""
         block_ids = []
@@ -68,27 +159,47 @@ class BlockReplacer:
                 block_ids.append(f"{mod['modid']}:{block['id']}")
         return block_ids
 
-    def find_similar_blocks(self, missing_block: Dict[str, Any], num_matches: int = 30) -> List[Dict[str, Any]]:
-        """Encontra blocos semelhantes com base no nome e ID."""
-        missing_id = missing_block['id']
-        missing_display_name = missing_block['display_name']
-        
-        all_blocks = []
+    def _build_candidate_blocks(self) -> List[Dict[str, Any]]:
+        """Monta uma única vez a lista de blocos do pack final usada como candidatos."""
+        candidates = []
         for mod in self.existing_blocks.values():
             for block in mod.get('blocks', []):
                 block_copy = block.copy()
                 block_copy['full_id'] = f"{mod['modid']}:{block['id']}"
                 block_copy['mod_name'] = mod['name']
-                all_blocks.append(block_copy)
+                candidates.append(block_copy)
+        return candidates
+
+    def find_similar_blocks(self, missing_block: Dict[str, Any], num_matches: int = 30,
+                            use_tags: bool = True) -> List[Dict[str, Any]]:
+        """Encontra blocos semelhantes com base no nome, ID e, se disponível, na textura.
+
+        Com `use_tags`, apenas os blocos que compartilham tags com o faltante são pontuados.
+        """
+        missing_id = missing_block['id']
+        missing_display_name = missing_block['display_name']
+        
+        positions = self._tag_candidates(missing_block) if use_tags else None
+        if positions is None:
+            positions = range(len(self.candidate_blocks))
+        all_blocks = [self.candidate_blocks[i].copy() for i in positions]
+
+        signature = self.origin_textures.get(f"{missing_block['modid']}:{missing_id}")
+        visual_scores = self.final_textures.similarity(signature) if signature else None
         
-        for block in all_blocks:
+        for i, block in zip(positions, all_blocks):
             id_similarity = difflib.SequenceMatcher(None, missing_id, block['id']).ratio()
             name_similarity = difflib.SequenceMatcher(
                 None, 
                 missing_display_name.lower(), 
                 block.get('display_name', '').lower()
             ).ratio()
-            block['similarity_score'] = (id_similarity * 0.6) + (name_similarity * 0.4)
+            # Candidatos sem textura indexada mantêm os pesos de texto, sem penalidade visual
+            if visual_scores is not None and self.final_textures.present[i]:
+                block['similarity_score'] = ((id_similarity * 0.45) + (name_similarity * 0.25) +
+                                             (float(visual_scores[i]) * 0.3))
+            else:
+                block['similarity_score'] = (id_similarity * 0.6) + (name_similarity * 0.4)
         
         all_blocks.sort(key=lambda x: x['similarity_score'], reverse=True)
         return all_blocks[:num_matches]
@@ -109,8 +220,9 @@ class BlockReplacer:
 
     def get_replacement_block(self, missing_block: Dict[str, Any]) -> Optional[str]:
         """Obtém o bloco de substituição para um bloco faltante."""
+        use_tags = True
         while True:
-            similar_blocks = self.find_similar_blocks(missing_block)
+            similar_blocks = self.find_similar_blocks(missing_block, use_tags=use_tags)
             
             if missing_block.get('variant_info'):
                 self.visualizer.show_in_blockbench(missing_block, missing_block)
@@ -123,7 +235,8 @@ class BlockReplacer:
                 choice = int_range_input(min_choice, max_choice)
                 
                 if choice == 0:
-                    print("Refazendo a busca...")
+                    print("Refazendo a busca sem o filtro de tags...")
+                    use_tags = False
                     continue
                 elif choice == -1:
                     manual_id = input("Digite o ID completo do bloco (formato 'modid:block_id'): ")
@@ -137,24 +250,115 @@ class BlockReplacer:
             except ValueError:
                 print("Por favor, digite um número válido.")
 
+    def review_rule_suggestions(self, max_examples: int = 5) -> int:
+        """Aprende regras das correlações aceitas e oferece as sugestões em lote, uma decisão por regra.
+
+        Sugestões já recusadas nesta sessão não são oferecidas de novo. Retorna quantos
+        blocos foram resolvidos.
+        """
+        if not self.replacement_mapping:
+            return 0
+
+        self.rule_miner.mine(self.replacement_mapping)
+        remaining_blocks = [
+            block for block in self.missing_blocks
+            if not self._is_resolved(block)
+        ]
+        suggestions = self.rule_miner.suggest(remaining_blocks, set(self.existing_block_ids))
+
+        by_rule = {}
+        for missing_id, suggestion in suggestions.items():
+            if (suggestion['rule'], missing_id) not in self.declined_suggestions:
+                by_rule.setdefault(suggestion['rule'], []).append((missing_id, suggestion['replacement']))
+        if not by_rule:
+            return 0
+
+        resolved = 0
+
+        print(f"\n{sum(len(pairs) for pairs in by_rule.values())} sugestões encontradas a partir de {len(by_rule)} regras aprendidas.")
+        ordered_rules = sorted(by_rule.items(), key=lambda item: len(item[1]), reverse=True)
+        for rule, pairs in ordered_rules:
+            support = len(self.rule_miner.rules[rule])
+            print(f"\nRegra: {self.rule_miner.describe_rule(rule)} (suporte: {support}, aplica-se a {len(pairs)} blocos)")
+            for missing_id, replacement_id in pairs[:max_examples]:
+                print(f"  {missing_id} -> {replacement_id}")
+            if len(pairs) > max_examples:
+                print(f"  ... e mais {len(pairs) - max_examples}")
+            print("Aceitar todas as substituições desta regra?")
+            if bool_input():
+                for missing_id, replacement_id in pairs:
+                    self.replacement_mapping[missing_id] = replacement_id
+                resolved += len(pairs)
+            else:
+                self.declined_suggestions.update((rule, missing_id) for missing_id, _ in pairs)
+
+        self._save_progress()
+        return resolved
+
+    def review_unreferenced_blocks(self, remaining_blocks: List[Dict[str, Any]], max_examples: int = 10) -> None:
+        """Oferece dispensar em lote os blocos que nenhuma receita, loot table ou script usa.
+
+        Blocos dispensados ficam sem substituto e fora da fila; são registrados à parte
+        (e não como 'minecraft:air'), já que podem continuar colocados nos mundos.
+        """
+        if not self.reference_counts:
+            return  # Sem dados de referência não dá para distinguir blocos sem uso
+
+        unreferenced = [
+            f"{block['modid']}:{block['id']}" for block in remaining_blocks
+            if not self.reference_counts.get(f"{block['modid']}:{block['id']}")
+        ]
+        if not unreferenced:
+            return
+
+        print(f"\n{len(unreferenced)} blocos faltantes não são referenciados por nenhuma receita, loot table ou script:")
+        for missing_id in unreferenced[:max_examples]:
+            print(f"  {missing_id}")
+        if len(unreferenced) > max_examples:
+            print(f"  ... e mais {len(unreferenced) - max_examples}")
+        print("Dispensar todos? Eles ficam sem substituto e fora da fila, registrados em 'dismissed'.")
+        if bool_input():
+            self.dismissed.update(unreferenced)
+            self._save_progress()
+
+    def build_impact_queue(self, remaining_blocks: List[Dict[str, Any]]) -> List[Tuple[int, int, Dict[str, Any]]]:
+        """Monta a fila de prioridade: blocos mais referenciados primeiro, mantendo a ordem do arquivo nos empates."""
+        queue = [
+            (-self.reference_counts.get(f"{block['modid']}:{block['id']}", 0), order, block)
+            for order, block in enumerate(remaining_blocks)
+        ]
+        heapq.heapify(queue)
+        return queue
+
     def process_replacements(self) -> None:
-        """Processa todos os blocos faltantes."""
+        """Processa todos os blocos faltantes, dos mais referenciados para os menos."""
         print("\nProcesso de substituição de blocos faltantes")
         print("------------------------------------------")
         print("Durante o processo, digite '-2' para salvar e sair\n")
         
-        total_blocks = len(self.missing_blocks)
+        self.review_rule_suggestions()
+
         processed_count = 0
         
         # Filtra apenas os blocos que ainda não foram processados
         remaining_blocks = [
             block for block in self.missing_blocks 
-            if f"{block['modid']}:{block['id']}" not in self.replacement_mapping
+            if not self._is_resolved(block)
+        ]
+        self.review_unreferenced_blocks(remaining_blocks)
+        remaining_blocks = [
+            block for block in remaining_blocks
+            if not self._is_resolved(block)
         ]
+        queue = self.build_impact_queue(remaining_blocks)
+        total_blocks = len(remaining_blocks)
         
-        for missing_block in remaining_blocks:
+        while queue:
+            negative_references, _, missing_block = heapq.heappop(queue)
+            if self._is_resolved(missing_block):
+                continue  # Resolvido por uma regra aprendida durante a sessão
             missing_id = f"{missing_block['modid']}:{missing_block['id']}"
-            print(f"\nProcessando bloco faltante ({processed_count+1}/{len(remaining_blocks)}): {missing_id} ({missing_block['display_name']})")
+            print(f"\nProcessando bloco faltante ({processed_count+1}/{total_blocks}): {missing_id} ({missing_block['display_name']}) - {-negative_references} referências")
             
             replacement_id = self.get_replacement_block(missing_block)
             
@@ -170,6 +374,8 @@ class BlockReplacer:
             if processed_count % 5 == 0:
                 self._save_progress()
                 print(f"\nProgresso salvo após {processed_count} substituições.")
+                # Reaprende as regras com as decisões novas e resolve em lote o que elas cobrirem
+                total_blocks -= self.review_rule_suggestions()
         
         # Processamento completo
         self.save_final_results()
@@ -184,6 +390,12 @@ class BlockReplacer:
             result=self.replacement_mapping,
             file_path=output.CORRELATIONS
         )
+        if self.dismissed:
+            save_file(
+                base=output.BASE,
+                result=sorted(self.dismissed),
+                file_path='dismissed_blocks.json'
+            )
         print("\nProcesso concluído. Mapeamento final salvo.")
 
 def main():
@@ -198,6 +410,7 @@ def main():
             else:
                 print("Reiniciando o processo do início...")
                 replacer.replacement_mapping = {}
+                replacer.dismissed = set()
                 replacer.process_replacements()
         else:
             replacer.process_replacements()
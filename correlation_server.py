@@ -0,0 +1,489 @@
+import argparse
+import json
+import os
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Any, Optional, Tuple
+import requests
+from correlate_blocks import BlockReplacer
+from visualization import BlockVisualizer
+from utils import int_range_input
+
+
+class DecisionLog:
+    """Log de decisões só de acréscimo, mesclado como um registrador last-writer-wins por bloco.
+
+    Cada entrada recebe um relógio de Lamport; em conflito vence o maior (relógio, cliente).
+    Como a mescla é comutativa e idempotente, reaplicar o log em qualquer ordem dá o mesmo mapeamento.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.clock = 0
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._replay()
+
+    def _replay(self) -> None:
+        """Reconstrói o estado a partir do arquivo de log, se existir."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    self._merge(json.loads(line))
+
+    def _merge(self, entry: Dict[str, Any]) -> bool:
+        """Mescla uma entrada no estado; retorna True se ela passou a ser a vencedora."""
+        self.clock = max(self.clock, entry['clock'])
+        current = self.entries.get(entry['block'])
+        if current is None or (entry['clock'], entry['client']) > (current['clock'], current['client']):
+            self.entries[entry['block']] = entry
+            return True
+        return False
+
+    def append(self, block: str, replacement: str, client: str, seen_clock: int = 0) -> Dict[str, Any]:
+        """Registra uma decisão, avançando o relógio de Lamport."""
+        self.clock = max(self.clock, seen_clock) + 1
+        entry = {
+            'block': block,
+            'replacement': replacement,
+            'client': client,
+            'clock': self.clock,
+            'time': time.time()
+        }
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._merge(entry)
+        return entry
+
+    def mapping(self) -> Dict[str, str]:
+        """Mapeamento atual (bloco faltante -> substituto) resultante da mescla."""
+        return {block: entry['replacement'] for block, entry in self.entries.items()}
+
+
+class WorkPartitioner:
+    """Distribui lotes disjuntos de blocos faltantes, com concessões que expiram."""
+
+    def __init__(self, ordered_ids: List[str], lease_seconds: int = 900):
+        self.pending = list(ordered_ids)
+        self.lease_seconds = lease_seconds
+        self.leases: Dict[str, Tuple[str, List[str], float]] = {}
+        self.skipped: Dict[str, set] = {}
+
+    def _reclaim_expired(self) -> None:
+        """Devolve ao início da fila os blocos de concessões vencidas."""
+        now = time.time()
+        for batch_id, (_, block_ids, expires) in list(self.leases.items()):
+            if expires < now:
+                self.pending[:0] = block_ids
+                del self.leases[batch_id]
+
+    def claim(self, client: str, size: int, decided: Dict[str, Any]) -> Tuple[Optional[str], List[str]]:
+        """Reserva até `size` blocos ainda sem decisão para um cliente.
+
+        Blocos que o cliente já pulou só voltam para ele quando não houver mais nada.
+        """
+        self._reclaim_expired()
+        self.pending = [block_id for block_id in self.pending if block_id not in decided]
+        skipped = self.skipped.get(client, set())
+        block_ids = [block_id for block_id in self.pending if block_id not in skipped][:size]
+        if not block_ids:
+            skipped.clear()
+            block_ids = self.pending[:size]
+        if not block_ids:
+            return None, []
+        claimed = set(block_ids)
+        self.pending = [block_id for block_id in self.pending if block_id not in claimed]
+        batch_id = uuid.uuid4().hex
+        self.leases[batch_id] = (client, block_ids, time.time() + self.lease_seconds)
+        return batch_id, block_ids
+
+    def release(self, batch_id: str, decided: Dict[str, Any]) -> None:
+        """Encerra uma concessão, devolvendo ao fim da fila os blocos que ficaram sem decisão.
+
+        Esses blocos contam como pulados pelo cliente, para que o próximo lote dele traga outros.
+        """
+        lease = self.leases.pop(batch_id, None)
+        if lease:
+            client, block_ids, _ = lease
+            undecided = [block_id for block_id in block_ids if block_id not in decided]
+            self.pending.extend(undecided)
+            self.skipped.setdefault(client, set()).update(undecided)
+
+    def drop_completed(self, decided: Dict[str, Any]) -> None:
+        """Remove as concessões em que todos os blocos já têm decisão."""
+        for batch_id, (_, block_ids, _) in list(self.leases.items()):
+            if all(block_id in decided for block_id in block_ids):
+                del self.leases[batch_id]
+
+    def leased_count(self) -> int:
+        """Quantidade de blocos atualmente reservados."""
+        return sum(len(block_ids) for _, block_ids, _ in self.leases.values())
+
+
+class CorrelationServer:
+    """Servidor local que mantém o índice de similaridade carregado e coordena vários clientes."""
+
+    def __init__(self, config_path: str = 'config.ini', batch_size: int = 10, lease_seconds: int = 900):
+        self.replacer = BlockReplacer(config_path)
+        self.replacer.load_data()
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+
+        output = self.replacer.config['output']
+        self.log = DecisionLog(os.path.join(output.BASE, 'correlation_log.jsonl'))
+        # Decisões já salvas pelo modo de usuário único entram no log como ponto de partida
+        for block_id, replacement_id in self.replacer.replacement_mapping.items():
+            if block_id not in self.log.entries:
+                self.log.append(block_id, replacement_id, 'progress')
+
+        self.blocks_by_id = {f"{block['modid']}:{block['id']}": block for block in self.replacer.missing_blocks}
+        remaining = [
+            block for block_id, block in self.blocks_by_id.items()
+            if block_id not in self.log.entries and block_id not in self.replacer.dismissed
+        ]
+        queue = self.replacer.build_impact_queue(remaining)
+        ordered_ids = [f"{block['modid']}:{block['id']}" for _, _, block in sorted(queue)]
+        self.partitioner = WorkPartitioner(ordered_ids, lease_seconds)
+        self.valid_ids = set(self.replacer.existing_block_ids) | {'minecraft:air'}
+
+    def _describe(self, block_id: str, use_tags: bool = True) -> Dict[str, Any]:
+        """Monta os dados de um bloco do lote, incluindo as sugestões de substituição."""
+        block = self.blocks_by_id[block_id]
+        suggestions = self.replacer.find_similar_blocks(block, use_tags=use_tags)
+        return {
+            'block': block_id,
+            'display_name': block['display_name'],
+            'variant_info': block.get('variant_info', {}),
+            'references': self.replacer.reference_counts.get(block_id, 0),
+            'suggestions': [
+                {
+                    'full_id': suggestion['full_id'],
+                    'display_name': suggestion.get('display_name', 'Sem nome'),
+                    'similarity_score': suggestion['similarity_score']
+                }
+                for suggestion in suggestions
+            ]
+        }
+
+    def claim_batch(self, client: str, size: Optional[int] = None, use_tags: bool = True) -> Dict[str, Any]:
+        """Entrega um lote disjunto ao cliente; as sugestões são calculadas fora do lock."""
+        with self.lock:
+            batch_id, block_ids = self.partitioner.claim(client, size or self.batch_size, self.log.entries)
+            clock = self.log.clock
+        return {
+            'batch': batch_id,
+            'clock': clock,
+            'blocks': [self._describe(block_id, use_tags) for block_id in block_ids]
+        }
+
+    def suggest(self, block: str, use_tags: bool = True) -> Dict[str, Any]:
+        """Refaz a busca de sugestões de um bloco (ex.: sem o filtro de tags)."""
+        if block not in self.blocks_by_id:
+            raise ValueError(f"Bloco faltante desconhecido: {block}")
+        return self._describe(block, use_tags)
+
+    def record_decision(self, client: str, block: str, replacement: str, seen_clock: int = 0) -> Dict[str, Any]:
+        """Registra a decisão de um cliente no log."""
+        if block not in self.blocks_by_id:
+            raise ValueError(f"Bloco faltante desconhecido: {block}")
+        if replacement not in self.valid_ids:
+            raise ValueError(f"ID de substituição inválido: {replacement}")
+        with self.lock:
+            entry = self.log.append(block, replacement, client, seen_clock)
+            self.partitioner.drop_completed(self.log.entries)
+            finished = self._is_finished()
+        if finished:
+            self.save_results()
+        return {'clock': entry['clock'], 'finished': finished}
+
+    def release_batch(self, batch_id: str) -> None:
+        """Libera um lote (ex.: o cliente saiu antes de terminar)."""
+        with self.lock:
+            self.partitioner.release(batch_id, self.log.entries)
+
+    def _is_finished(self) -> bool:
+        return all(block_id in self.log.entries or block_id in self.replacer.dismissed
+                   for block_id in self.blocks_by_id)
+
+    def status(self) -> Dict[str, Any]:
+        """Resumo do andamento do trabalho."""
+        with self.lock:
+            decided = sum(1 for block_id in self.blocks_by_id if block_id in self.log.entries)
+            return {
+                'total': len(self.blocks_by_id),
+                'decided': decided,
+                'dismissed': len(self.replacer.dismissed),
+                'leased': self.partitioner.leased_count(),
+                'clock': self.log.clock
+            }
+
+    def save_results(self) -> None:
+        """Salva o mapeamento mesclado como correlações finais."""
+        with self.lock:
+            self.replacer.replacement_mapping = self.log.mapping()
+        self.replacer.save_final_results()
+
+
+WEB_PAGE = """<!DOCTYPE html>
+<html lang="pt-br">
+<head><meta charset="utf-8"><title>modpack-fix</title></head>
+<body>
+<h2>Correlação de blocos</h2>
+<p>Nome: <input id="client" value="web"> <button onclick="claim()">Pegar lote</button> <span id="status"></span></p>
+<div id="blocks"></div>
+<script>
+let clock = 0;
+let currentBatch = null;
+async function post(path, data) {
+  const response = await fetch(path, {method: 'POST', body: JSON.stringify(data)});
+  return response.json();
+}
+async function claim() {
+  if (currentBatch) {
+    await post('/release', {batch: currentBatch});
+  }
+  const batch = await post('/batch', {client: document.getElementById('client').value});
+  currentBatch = batch.batch;
+  clock = Math.max(clock, batch.clock);
+  const container = document.getElementById('blocks');
+  container.innerHTML = batch.blocks.length ? '' : 'Nenhum bloco pendente.';
+  for (const block of batch.blocks) {
+    const div = document.createElement('div');
+    render(div, block);
+    container.appendChild(div);
+  }
+  refresh();
+}
+function render(div, block) {
+  div.replaceChildren();
+  const header = document.createElement('h3');
+  header.textContent = `${block.block} (${block.display_name}) - ${block.references} referências`;
+  div.appendChild(header);
+  for (const suggestion of block.suggestions) {
+    const button = document.createElement('button');
+    button.textContent = `${suggestion.full_id} (${suggestion.similarity_score.toFixed(2)})`;
+    button.onclick = () => decide(div, block.block, suggestion.full_id);
+    div.appendChild(button);
+  }
+  const manual = document.createElement('input');
+  manual.placeholder = 'modid:block_id';
+  manual.onchange = () => decide(div, block.block, manual.value);
+  div.appendChild(manual);
+  const unfiltered = document.createElement('button');
+  unfiltered.textContent = 'Buscar sem o filtro de tags';
+  unfiltered.onclick = async () => render(div, await post('/suggestions', {block: block.block, use_tags: false}));
+  div.appendChild(unfiltered);
+}
+async function decide(div, block, replacement) {
+  const result = await post('/decision', {client: document.getElementById('client').value, block, replacement, clock});
+  if (result.error) { alert(result.error); return; }
+  clock = Math.max(clock, result.clock);
+  div.remove();
+  refresh();
+}
+async function refresh() {
+  const status = await (await fetch('/status')).json();
+  document.getElementById('status').textContent = `${status.decided}/${status.total} decididos, ${status.leased} reservados`;
+}
+refresh();
+</script>
+</body>
+</html>
+"""
+
+
+class CorrelationRequestHandler(BaseHTTPRequestHandler):
+    """Rotas HTTP do servidor de correlação."""
+
+    server_state: CorrelationServer = None
+
+    def _send_json(self, data: Any, status: int = 200) -> None:
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(length).decode('utf-8')) if length else {}
+
+    def do_GET(self) -> None:
+        if self.path == '/':
+            body = WEB_PAGE.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path == '/status':
+            self._send_json(self.server_state.status())
+        else:
+            self._send_json({'error': 'Rota não encontrada'}, 404)
+
+    @staticmethod
+    def _field(data: Dict[str, Any], name: str, kind: type, default: Any = KeyError) -> Any:
+        """Lê um campo do corpo, exigindo o tipo informado (ausente e sem padrão = erro)."""
+        if name not in data:
+            if default is KeyError:
+                raise ValueError(f"Campo obrigatório ausente: {name}")
+            return default
+        value = data[name]
+        # bool é subclasse de int, mas true/false não são números válidos aqui
+        if not isinstance(value, kind) or (kind is int and isinstance(value, bool)):
+            raise ValueError(f"Campo '{name}' deve ser do tipo {kind.__name__}")
+        return value
+
+    def do_POST(self) -> None:
+        try:
+            data = self._read_json()
+            if not isinstance(data, dict):
+                raise ValueError("O corpo da requisição deve ser um objeto JSON")
+            if self.path == '/batch':
+                size = self._field(data, 'size', int, None)
+                if size is not None and size <= 0:
+                    raise ValueError("Campo 'size' deve ser positivo")
+                self._send_json(self.server_state.claim_batch(
+                    self._field(data, 'client', str, 'anônimo'), size, self._field(data, 'use_tags', bool, True)
+                ))
+            elif self.path == '/suggestions':
+                self._send_json(self.server_state.suggest(
+                    self._field(data, 'block', str), self._field(data, 'use_tags', bool, True)
+                ))
+            elif self.path == '/decision':
+                self._send_json(self.server_state.record_decision(
+                    self._field(data, 'client', str, 'anônimo'), self._field(data, 'block', str),
+                    self._field(data, 'replacement', str), self._field(data, 'clock', int, 0)
+                ))
+            elif self.path == '/release':
+                batch_id = self._field(data, 'batch', str)
+                self.server_state.release_batch(batch_id)
+                self._send_json({'released': batch_id})
+            else:
+                self._send_json({'error': 'Rota não encontrada'}, 404)
+        except ValueError as e:
+            self._send_json({'error': str(e)}, 400)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass  # Evita poluir o terminal a cada requisição
+
+
+class CorrelationClient:
+    """Cliente de linha de comando que trabalha sobre lotes recebidos do servidor."""
+
+    def __init__(self, url: str, client_name: str):
+        self.url = url.rstrip('/')
+        self.client_name = client_name
+        self.clock = 0
+        self.visualizer = BlockVisualizer()
+
+    def _post(self, path: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        response = requests.post(self.url + path, json=data)
+        return response.json()
+
+    def display_block(self, block: Dict[str, Any]) -> None:
+        """Exibe o bloco faltante e suas sugestões, no mesmo formato do modo de usuário único."""
+        print(f"\nBloco faltante: {block['block']} ({block['display_name']}) - {block['references']} referências")
+        print("Blocos semelhantes encontrados:")
+        for i, suggestion in enumerate(block['suggestions'], 1):
+            print(f"{i}. {suggestion['full_id']} ({suggestion['display_name']}) - Similaridade: {suggestion['similarity_score']:.2f}")
+        print("0. Nenhum satisfatório - buscar sem o filtro de tags")
+        print("-1. Digitar ID manualmente")
+        print("-2. Liberar o lote e sair")
+        print("-3. Pular este bloco")
+
+    def run(self) -> None:
+        """Pega lotes até acabarem os blocos ou o usuário sair."""
+        while True:
+            batch = self._post('/batch', {'client': self.client_name})
+            self.clock = max(self.clock, batch['clock'])
+            if not batch['blocks']:
+                print("\nNenhum bloco pendente. Obrigado!")
+                return
+
+            for block in batch['blocks']:
+                if block['variant_info']:
+                    modid, _, block_id = block['block'].partition(':')
+                    missing_block = {'modid': modid, 'id': block_id}
+                    self.visualizer.show_in_blockbench(missing_block, missing_block)
+
+                while True:
+                    self.display_block(block)
+                    choice = int_range_input(-3, len(block['suggestions']))
+                    if choice == -2:
+                        self._post('/release', {'batch': batch['batch']})
+                        print("\nLote liberado. Suas decisões já foram registradas no servidor.")
+                        return
+                    if choice == -3:
+                        break
+                    if choice == 0:
+                        print("Refazendo a busca sem o filtro de tags...")
+                        block = self._post('/suggestions', {'block': block['block'], 'use_tags': False})
+                        continue
+                    if choice == -1:
+                        replacement = input("Digite o ID completo do bloco (formato 'modid:block_id'): ")
+                    else:
+                        replacement = block['suggestions'][choice - 1]['full_id']
+
+                    result = self._post('/decision', {
+                        'client': self.client_name,
+                        'block': block['block'],
+                        'replacement': replacement,
+                        'clock': self.clock
+                    })
+                    if 'error' in result:
+                        print(result['error'])
+                        continue
+                    self.clock = max(self.clock, result['clock'])
+                    break
+
+            self._post('/release', {'batch': batch['batch']})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Correlação de blocos com vários usuários.")
+    subparsers = parser.add_subparsers(dest='mode', required=True)
+
+    serve = subparsers.add_parser('serve', help="Inicia o servidor local")
+    serve.add_argument('--config', default='config.ini')
+    serve.add_argument('--host', default='127.0.0.1',
+                       help="Endereço de escuta (use 0.0.0.0 para aceitar clientes da rede local)")
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--batch-size', type=int, default=10)
+
+    client = subparsers.add_parser('client', help="Conecta a um servidor pelo terminal")
+    client.add_argument('--url', default='http://localhost:8765')
+    client.add_argument('--name', required=True)
+
+    args = parser.parse_args()
+
+    try:
+        if args.mode == 'serve':
+            CorrelationRequestHandler.server_state = CorrelationServer(args.config, args.batch_size)
+            httpd = ThreadingHTTPServer((args.host, args.port), CorrelationRequestHandler)
+            print(f"\nServidor de correlação em http://{args.host}:{args.port}")
+            try:
+                httpd.serve_forever()
+            except KeyboardInterrupt:
+                state = CorrelationRequestHandler.server_state
+                with state.lock:
+                    finished = state._is_finished()
+                if finished:
+                    state.save_results()
+                else:
+                    # Resultados parciais não viram correlações finais; o log guarda as decisões
+                    print(f"\nServidor encerrado. As decisões continuam em {state.log.path} para a próxima execução.")
+        else:
+            CorrelationClient(args.url, args.name).run()
+    except Exception as e:
+        print(f"\nOcorreu um erro: {e}")
+
+
+if __name__ == "__main__":
+    main()
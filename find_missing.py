@@ -1,5 +1,6 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from utils import read_config, load_json, save_file
+from blockstates import BlockStateSchemas
 
 
 class ModpackComparator:
@@ -12,7 +13,8 @@ class ModpackComparator:
         self.missing_elements = {
             'blocks': [],
             'items': [],
-            'entities': []
+            'entities': [],
+            'states': []
         }
 
     def _load_config(self, config_path: str) -> Any:
@@ -25,22 +27,40 @@ class ModpackComparator:
 
     def load_data(self) -> None:
         """Carrega os dados dos modpacks de origem e final."""
+        self.set_data(None, None)
+
+    def _load_origin_data(self) -> Dict[str, Any]:
+        """Carrega os dados do modpack de origem dos arquivos JSON."""
         output = self.config['output']
-        
-        # Carrega dados do modpack de origem
-        self.origin_data = {
+        return {
             'blocks': load_json(output.BASE + output.DC_BLOCKS),
             'items': load_json(output.BASE + output.DC_ITEMS),
-            'entities': load_json(output.BASE + output.DC_ENTITIES)
+            'entities': load_json(output.BASE + output.DC_ENTITIES),
+            'states': load_json(output.BASE + output.DC_STATES)
         }
-        
-        # Carrega dados do modpack final
-        self.final_data = {
+
+    def _load_final_data(self) -> Dict[str, Any]:
+        """Carrega os dados do modpack final dos arquivos JSON."""
+        output = self.config['output']
+        return {
             'blocks': load_json(output.BASE + output.RC_BLOCKS),
             'items': load_json(output.BASE + output.RC_ITEMS),
-            'entities': load_json(output.BASE + output.RC_ENTITIES)
+            'entities': load_json(output.BASE + output.RC_ENTITIES),
+            'states': load_json(output.BASE + output.RC_STATES)
         }
 
+    def set_data(self, origin_catalog: Optional[Dict[str, Any]], final_catalog: Optional[Dict[str, Any]]) -> None:
+        """Usa catálogos já carregados em memória (ex.: vindos do prep); o lado ausente é lido dos arquivos JSON."""
+        keys = ('blocks', 'items', 'entities', 'states')
+        if origin_catalog is not None:
+            self.origin_data = {key: origin_catalog.get(key) for key in keys}
+        else:
+            self.origin_data = self._load_origin_data()
+        if final_catalog is not None:
+            self.final_data = {key: final_catalog.get(key) for key in keys}
+        else:
+            self.final_data = self._load_final_data()
+
     def find_missing_elements(self) -> None:
         """Encontra todos os elementos faltantes entre os modpacks."""
         self.missing_elements['blocks'] = self._find_missing(
@@ -58,6 +78,7 @@ class ModpackComparator:
             self.final_data['entities'],
             'entities'
         )
+        self.missing_elements['states'] = self._find_missing_states()
 
     def _find_missing(self, origin_elements: Dict, final_elements: Dict, element_type: str) -> List[Dict]:
         """Método genérico para encontrar elementos faltantes de um tipo específico."""
@@ -73,7 +94,7 @@ class ModpackComparator:
             else:
                 # Verifica elementos individuais
                 final_data = final_elements[modid]
-                final_ids = [elem['id'] for elem in final_data[element_type]]
+                final_ids = {elem['id'] for elem in final_data[element_type]}
                 
                 for origin_element in origin_data[element_type]:
                     if origin_element['id'] not in final_ids:
@@ -83,6 +104,37 @@ class ModpackComparator:
         
         return missing_elements
 
+    def _find_missing_states(self) -> List[Dict]:
+        """Encontra blocos presentes nos dois packs que perderam valores de propriedades.
+
+        Um bloco que existe no pack final mas sem, por exemplo, 'type=double' ainda quebra
+        os mundos que têm esse estado salvo.
+        """
+        if not self.origin_data.get('states') or not self.final_data.get('states'):
+            return []
+
+        origin_schemas = BlockStateSchemas(self.origin_data['states'])
+        final_schemas = BlockStateSchemas(self.final_data['states'])
+        lost_states = origin_schemas.diff(final_schemas, list(origin_schemas.blocks.keys()))
+
+        display_names = {
+            f"{modid}:{block['id']}": block['display_name']
+            for modid, mod in self.origin_data['blocks'].items()
+            for block in mod['blocks']
+        }
+        missing_states = []
+        for full_id, diff in lost_states.items():
+            modid, _, block_id = full_id.partition(':')
+            missing_states.append({
+                'id': block_id,
+                'display_name': display_names.get(full_id, 'Unknown'),
+                'modid': modid,
+                'lost_states': diff['lost_states'],
+                # Falso quando o pack final usa multipart, que não lista todos os estados
+                'verified': diff['verified']
+            })
+        return missing_states
+
     def save_results(self) -> None:
         """Salva os resultados em arquivos JSON."""
         output = self.config['output']
@@ -90,6 +142,7 @@ class ModpackComparator:
         save_file(output.BASE, self.missing_elements['blocks'], output.MISSING_BLOCKS)
         save_file(output.BASE, self.missing_elements['items'], output.MISSING_ITEMS)
         save_file(output.BASE, self.missing_elements['entities'], output.MISSING_ENTITIES)
+        save_file(output.BASE, self.missing_elements['states'], output.MISSING_STATES)
 
     def print_results(self) -> None:
         """Exibe os resultados da comparação."""
@@ -99,11 +152,15 @@ class ModpackComparator:
         print(f"- Blocos faltantes: {len(self.missing_elements['blocks'])}")
         print(f"- Itens faltantes: {len(self.missing_elements['items'])}")
         print(f"- Entidades faltantes: {len(self.missing_elements['entities'])}")
+        unverified = sum(1 for state in self.missing_elements['states'] if not state['verified'])
+        print(f"- Blocos com estados faltantes: {len(self.missing_elements['states'])}"
+              f" ({unverified} não verificáveis: blockstate multipart no pack final)")
 
         print("\nArquivos JSON gerados:")
         print(f"- Blocos faltantes: {output.BASE + output.MISSING_BLOCKS}")
         print(f"- Itens faltantes: {output.BASE + output.MISSING_ITEMS}")
         print(f"- Entidades faltantes: {output.BASE + output.MISSING_ENTITIES}")
+        print(f"- Estados faltantes: {output.BASE + output.MISSING_STATES}")
 
 
 def main():
@@ -0,0 +1,220 @@
+import argparse
+import hashlib
+import os
+from typing import Callable, Dict, List, Any, Optional
+from utils import read_config, load_json, save_file
+from prep import ModExtractor, ModPackProcessor
+from find_missing import ModpackComparator
+from correlate_blocks import BlockReplacer
+
+
+class PipelineStage:
+    """Etapa do pipeline: declara suas entradas, saídas e dependências."""
+
+    def __init__(self, name: str, run: Callable[[Dict[str, Any]], bool],
+                 inputs: Optional[List[str]] = None, outputs: Optional[List[str]] = None,
+                 depends_on: Optional[List[str]] = None):
+        self.name = name
+        self.run = run
+        self.inputs = inputs or []
+        self.outputs = outputs or []
+        self.depends_on = depends_on or []
+
+
+class Pipeline:
+    """Orquestra as etapas como um DAG, pulando as que têm entradas inalteradas.
+
+    A impressão digital de uma etapa combina os metadados (caminho, tamanho, mtime) de
+    suas entradas com as impressões digitais das etapas de que depende, de modo que uma
+    mudança se propaga para todas as etapas seguintes. Os resultados de cada etapa ficam
+    em `context`, para que as seguintes os usem sem reler os arquivos JSON.
+    """
+
+    def __init__(self, state_base: str, state_file: str):
+        self.stages: Dict[str, PipelineStage] = {}
+        self.state_base = state_base
+        self.state_file = state_file
+        self.state: Dict[str, str] = {}
+        self.context: Dict[str, Any] = {}
+
+    def add_stage(self, stage: PipelineStage) -> None:
+        """Registra uma etapa (as dependências devem ser registradas antes)."""
+        for dependency in stage.depends_on:
+            if dependency not in self.stages:
+                raise ValueError(f"Etapa '{stage.name}' depende de '{dependency}', que não foi registrada")
+        self.stages[stage.name] = stage
+
+    def _load_state(self) -> None:
+        """Carrega as impressões digitais da última execução."""
+        path = os.path.join(self.state_base, self.state_file)
+        self.state = (load_json(path) if os.path.exists(path) else None) or {}
+
+    def _save_state(self) -> None:
+        """Salva as impressões digitais das etapas concluídas."""
+        save_file(self.state_base, self.state, self.state_file)
+
+    def _path_fingerprint(self, path: str, digest: Any) -> None:
+        """Adiciona ao hash os metadados de um arquivo ou de todos os arquivos de uma pasta."""
+        digest.update(path.encode('utf-8'))
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            digest.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode('utf-8'))
+        elif os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for file in sorted(files):
+                    file_path = os.path.join(root, file)
+                    stat = os.stat(file_path)
+                    digest.update(f"{file_path}:{stat.st_size}:{stat.st_mtime_ns}".encode('utf-8'))
+        else:
+            digest.update(b'<ausente>')
+
+    def fingerprint(self, stage: PipelineStage, fingerprints: Dict[str, str]) -> str:
+        """Calcula a impressão digital de uma etapa a partir de suas entradas e dependências."""
+        digest = hashlib.sha256(stage.name.encode('utf-8'))
+        for path in stage.inputs:
+            self._path_fingerprint(path, digest)
+        for output in stage.outputs:
+            digest.update(output.encode('utf-8'))
+        for dependency in stage.depends_on:
+            digest.update(fingerprints[dependency].encode('utf-8'))
+        return digest.hexdigest()
+
+    def _is_up_to_date(self, stage: PipelineStage, fingerprint: str) -> bool:
+        """Uma etapa está atualizada se a impressão digital bate e todas as saídas existem."""
+        return (self.state.get(stage.name) == fingerprint and
+                all(os.path.exists(output) for output in stage.outputs))
+
+    def run(self, force: bool = False, skip: Optional[List[str]] = None) -> None:
+        """Executa as etapas em ordem de dependência."""
+        skip = skip or []
+        self._load_state()
+        fingerprints = {}
+
+        for name, stage in self.stages.items():
+            fingerprints[name] = self.fingerprint(stage, fingerprints)
+
+            if name in skip:
+                print(f"\n[{name}] ignorada")
+                continue
+            if not force and self._is_up_to_date(stage, fingerprints[name]):
+                print(f"\n[{name}] atualizada, pulando")
+                continue
+
+            print(f"\n[{name}] executando...")
+            completed = stage.run(self.context)
+            if completed:
+                self.state[name] = fingerprints[name]
+            else:
+                self.state.pop(name, None)
+            self._save_state()
+
+
+def build_pipeline(config_path: str = 'config.ini') -> Pipeline:
+    """Monta o pipeline prep -> find_missing -> correlate a partir da configuração."""
+    Folders, Output, Clients = read_config(config_path)
+    base = Output.BASE
+    pipeline = Pipeline(base, Output.PIPELINE_STATE)
+    processor = ModPackProcessor(ModExtractor())
+
+    final_files = {
+        'blocks': Output.RC_BLOCKS,
+        'items': Output.RC_ITEMS,
+        'entities': Output.RC_ENTITIES,
+        'textures': Output.RC_TEXTURES,
+        'tags': Output.RC_TAGS,
+        'references': Output.RC_REFERENCES,
+        'states': Output.RC_STATES
+    }
+    origin_files = {
+        'blocks': Output.DC_BLOCKS,
+        'items': Output.DC_ITEMS,
+        'entities': Output.DC_ENTITIES,
+        'textures': Output.DC_TEXTURES,
+        'tags': Output.DC_TAGS,
+        'references': Output.DC_REFERENCES,
+        'states': Output.DC_STATES
+    }
+    missing_files = [Output.MISSING_BLOCKS, Output.MISSING_ITEMS, Output.MISSING_ENTITIES, Output.MISSING_STATES]
+
+    def prep_final(context: Dict[str, Any]) -> bool:
+        context['final_catalog'] = processor.process_modpack(
+            mods_folder=Folders.RC_MODS,
+            output_base=base,
+            output_files=final_files,
+            client_path=Clients.FINAL,
+            kube_path=Folders.RC_KUBE
+        )
+        return True
+
+    def prep_origin(context: Dict[str, Any]) -> bool:
+        context['origin_catalog'] = processor.process_modpack(
+            mods_folder=Folders.DC_MODS,
+            output_base=base,
+            output_files=origin_files,
+            client_path=Clients.ORIGINAL
+        )
+        return True
+
+    def find_missing(context: Dict[str, Any]) -> bool:
+        comparator = ModpackComparator(config_path)
+        # Usa o catálogo em memória de cada pack que foi processado nesta execução
+        comparator.set_data(context.get('origin_catalog'), context.get('final_catalog'))
+        comparator.find_missing_elements()
+        comparator.save_results()
+        comparator.print_results()
+        context['missing_elements'] = comparator.missing_elements
+        return True
+
+    def correlate(context: Dict[str, Any]) -> bool:
+        replacer = BlockReplacer(config_path)
+        missing_elements = context.get('missing_elements')
+        replacer.load_data(
+            final_catalog=context.get('final_catalog'),
+            origin_catalog=context.get('origin_catalog'),
+            missing_blocks=missing_elements['blocks'] if missing_elements else None
+        )
+        replacer.process_replacements()
+        # Só é considerada concluída quando não sobra progresso parcial salvo
+        return not os.path.exists(replacer.progress_file)
+
+    pipeline.add_stage(PipelineStage(
+        'prep_final', prep_final,
+        inputs=[Folders.RC_MODS, Clients.FINAL, Folders.RC_KUBE],
+        outputs=[os.path.join(base, path) for path in final_files.values()]
+    ))
+    pipeline.add_stage(PipelineStage(
+        'prep_origin', prep_origin,
+        inputs=[Folders.DC_MODS, Clients.ORIGINAL],
+        outputs=[os.path.join(base, path) for path in origin_files.values()]
+    ))
+    pipeline.add_stage(PipelineStage(
+        'find_missing', find_missing,
+        outputs=[os.path.join(base, path) for path in missing_files],
+        depends_on=['prep_final', 'prep_origin']
+    ))
+    pipeline.add_stage(PipelineStage(
+        'correlate', correlate,
+        outputs=[os.path.join(base, Output.CORRELATIONS)],
+        depends_on=['find_missing']
+    ))
+    return pipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Executa prep, find_missing e correlate, pulando etapas atualizadas.")
+    parser.add_argument('--config', default='config.ini', help="Arquivo de configuração")
+    parser.add_argument('--force', action='store_true', help="Executa todas as etapas mesmo se atualizadas")
+    parser.add_argument('--skip', nargs='*', default=[], help="Etapas a ignorar (ex.: correlate)")
+    args = parser.parse_args()
+
+    try:
+        pipeline = build_pipeline(args.config)
+        pipeline.run(force=args.force, skip=args.skip)
+        print("\nPipeline concluído.")
+    except Exception as e:
+        print(f"\nOcorreu um erro durante a execução: {e}")
+
+
+if __name__ == "__main__":
+    main()
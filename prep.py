@@ -1,9 +1,14 @@
 import os
+import re
 import zipfile
 import json
 import toml
+from collections import Counter
 from typing import Dict, List, Any, Tuple, Optional
 from utils import read_config, load_json, save_file
+from textures import TextureHasher
+from tags import TagIndex
+from blockstates import BlockStateSchemas
 
 
 class ModExtractor:
@@ -16,11 +21,23 @@ class ModExtractor:
         'version': 'Unknown',
         'blocks': [],
         'items': [],
-        'entities': []
+        'entities': [],
+        'textures': {},
+        'tags': {'blocks': {}, 'items': {}},
+        'references': {}
     }
 
+    REFERENCE_FOLDERS = ('recipes', 'recipe', 'loot_tables', 'loot_table')
+    # Chaves cujo valor é um tipo/função e não um bloco ou item
+    NON_REFERENCE_KEYS = ('type', 'function', 'condition', 'tag', 'predicate')
+    ID_PATTERN = re.compile(r'^[a-z0-9_.-]+:[a-z0-9_./-]+$')
+    QUOTED_ID_PATTERN = re.compile(r'[\'"`]([a-z0-9_.-]+:[a-z0-9_./-]+)[\'"`]')
+    TAG_FOLDERS = {'blocks': 'blocks', 'block': 'blocks', 'items': 'items', 'item': 'items'}
+    TEXTURE_KEYS = ('all', 'side', 'texture', 'front', 'top', 'particle')
+
     def __init__(self):
         self.lang_cache = {}
+        self.hasher = TextureHasher()
 
     def extract_mod_info(self, mod_path: str) -> Dict[str, Any]:
         """Extrai informações principais de um arquivo de mod."""
@@ -47,13 +64,18 @@ class ModExtractor:
             'version': 'Unknown',
             'blocks': [],
             'items': [],
-            'entities': []
+            'entities': [],
+            'textures': {},
+            'tags': {'blocks': {}, 'items': {}},
+            'references': {}
         }
 
         try:
             with zipfile.ZipFile(client_path, 'r') as jar:
                 self._load_lang_files(jar, 'minecraft')
-                client_info['blocks'] = self._extract_blocks(jar, 'minecraft')
+                client_info['blocks'], client_info['textures'] = self._extract_blocks(jar, 'minecraft')
+                client_info['tags'] = self._extract_tags(jar)
+                client_info['references'] = self._extract_references(jar)
                 client_info['items'] = self._extract_items(jar, 'minecraft')
                 client_info['entities'] = self._extract_entities(jar, 'minecraft')
 
@@ -89,11 +111,15 @@ class ModExtractor:
     def _extract_game_content(self, jar: zipfile.ZipFile, mod_info: Dict[str, Any]) -> None:
         """Extrai conteúdo do jogo (blocos, itens, entidades)."""
         self._load_lang_files(jar, mod_info['modid'])
+        blocks, textures = self._extract_blocks(jar, mod_info['modid'])
         
         mod_info.update({
-            'blocks': self._extract_blocks(jar, mod_info['modid']),
+            'blocks': blocks,
+            'textures': textures,
             'items': self._extract_items(jar, mod_info['modid']),
-            'entities': self._extract_entities(jar, mod_info['modid'])
+            'entities': self._extract_entities(jar, mod_info['modid']),
+            'tags': self._extract_tags(jar),
+            'references': self._extract_references(jar)
         })
 
     def _load_lang_files(self, jar: zipfile.ZipFile, modid: str) -> None:
@@ -115,19 +141,34 @@ class ModExtractor:
                 'en_us' in parts and 
                 path.endswith('.json'))
 
-    def _extract_blocks(self, jar: zipfile.ZipFile, modid: str) -> List[Dict[str, Any]]:
-        """Extrai informações sobre blocos do mod."""
+    def _extract_blocks(self, jar: zipfile.ZipFile, modid: str) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+        """Extrai informações sobre blocos do mod e as assinaturas visuais de suas texturas."""
         blocks = []
+        textures = {}
         for file in jar.namelist():
             if self._is_block_file(file, modid):
                 block_id = file.split('/')[-1].replace('.json', '')
+                block_data = self._read_json(jar, file)
                 block_info = {
                     'id': block_id,
                     'display_name': self._get_display_name('block', modid, block_id),
-                    'variant_info': self._extract_block_variants(jar, file)
+                    'variant_info': self._extract_block_variants(block_data),
+                    'blockstate_format': 'multipart' if block_data and 'multipart' in block_data else 'variants'
                 }
                 blocks.append(block_info)
-        return blocks
+
+                signature = self._extract_block_texture(jar, modid, block_id, block_data)
+                if signature:
+                    textures[block_id] = signature
+        return blocks, textures
+
+    def _read_json(self, jar: zipfile.ZipFile, path: str) -> Optional[Any]:
+        """Lê um arquivo JSON do jar, retornando None se não existir ou for inválido."""
+        try:
+            with jar.open(path) as f:
+                return json.loads(f.read().decode('utf-8'))
+        except (KeyError, ValueError):
+            return None
 
     def _is_block_file(self, path: str, modid: str) -> bool:
         """Verifica se o arquivo é um arquivo de blockstate válido."""
@@ -138,16 +179,17 @@ class ModExtractor:
                 'blockstates' in parts and
                 path.endswith('.json'))
 
-    def _extract_block_variants(self, jar: zipfile.ZipFile, block_file: str) -> Dict[str, List[str]]:
-        """Extrai variantes de um bloco."""
+    def _extract_block_variants(self, block_data: Optional[Dict[str, Any]]) -> Dict[str, List[str]]:
+        """Extrai variantes de um bloco, tanto de blockstates 'variants' quanto 'multipart'."""
         variant_info = {}
-        with jar.open(block_file) as f:
-            block_data = json.loads(f.read().decode('utf-8'))
-            
-            if 'variants' in block_data:
-                for variant_key, _ in block_data['variants'].items():
-                    if variant_key:
-                        self._process_variant_key(variant_key, variant_info)
+        if block_data and 'variants' in block_data:
+            for variant_key, _ in block_data['variants'].items():
+                if variant_key:
+                    self._process_variant_key(variant_key, variant_info)
+        if block_data and 'multipart' in block_data:
+            for part in block_data['multipart']:
+                if isinstance(part, dict) and 'when' in part:
+                    self._process_multipart_condition(part['when'], variant_info)
         for key in variant_info:
             variant_info[key] = list(variant_info[key])
         
@@ -156,12 +198,148 @@ class ModExtractor:
     def _process_variant_key(self, variant_key: str, variant_info: Dict[str, set]) -> None:
         """Processa uma chave de variante e atualiza o dicionário."""
         for keyval in variant_key.split(','):
-            key, val = keyval.split('=')
+            if '=' not in keyval:
+                continue  # Chaves antigas como 'normal' não descrevem propriedades
+            key, val = keyval.split('=', 1)
             if key not in variant_info.keys():
                 variant_info[key] = set()
-            print
             variant_info[key].add(val)
 
+    def _process_multipart_condition(self, condition: Any, variant_info: Dict[str, set]) -> None:
+        """Processa uma condição 'when' de multipart (incluindo OR/AND aninhados)."""
+        if isinstance(condition, list):
+            for sub_condition in condition:
+                self._process_multipart_condition(sub_condition, variant_info)
+            return
+        if not isinstance(condition, dict):
+            return
+
+        for key, value in condition.items():
+            if key in ('OR', 'AND'):
+                self._process_multipart_condition(value, variant_info)
+                continue
+            # Valores podem vir como booleanos/números e com alternativas separadas por '|'
+            text = str(value).lower() if isinstance(value, bool) else str(value)
+            if key not in variant_info.keys():
+                variant_info[key] = set()
+            for val in text.lstrip('!').split('|'):
+                variant_info[key].add(val)
+
+    def _extract_block_texture(self, jar: zipfile.ZipFile, modid: str, block_id: str,
+                               block_data: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Localiza a textura principal do bloco (blockstate -> modelo -> textura) e calcula sua assinatura."""
+        default_path = f"assets/{modid}/textures/block/{block_id}.png"
+        texture_path = default_path
+        model_ref = self._first_model_reference(block_data)
+        if model_ref:
+            model = self._read_json(jar, self._resource_path(model_ref, 'models', '.json'))
+            texture_ref = self._main_texture_reference(model)
+            if texture_ref:
+                texture_path = self._resource_path(texture_ref, 'textures', '.png')
+
+        # Texturas vanilla ou de outro jar não estão neste jar; tenta a textura padrão do bloco
+        for path in dict.fromkeys([texture_path, default_path]):
+            try:
+                with jar.open(path) as f:
+                    return self.hasher.signature(f.read())
+            except KeyError:
+                continue
+        return None
+
+    def _first_model_reference(self, block_data: Optional[Dict[str, Any]]) -> Optional[str]:
+        """Obtém a referência do primeiro modelo usado pelo blockstate."""
+        if not block_data:
+            return None
+        if 'variants' in block_data:
+            entries = list(block_data['variants'].values())
+        else:
+            entries = [part.get('apply') for part in block_data.get('multipart', [])]
+
+        for entry in entries:
+            if isinstance(entry, list):
+                entry = entry[0] if entry else None
+            if isinstance(entry, dict) and 'model' in entry:
+                return entry['model']
+        return None
+
+    def _main_texture_reference(self, model: Optional[Dict[str, Any]]) -> Optional[str]:
+        """Escolhe a textura mais representativa de um modelo, ignorando referências a variáveis."""
+        if not model or not isinstance(model.get('textures'), dict):
+            return None
+        textures = {key: value for key, value in model['textures'].items()
+                    if isinstance(value, str) and not value.startswith('#')}
+        for key in self.TEXTURE_KEYS:
+            if key in textures:
+                return textures[key]
+        return next(iter(textures.values()), None)
+
+    def _resource_path(self, reference: str, folder: str, extension: str) -> str:
+        """Converte uma referência 'ns:caminho' no caminho do arquivo dentro do jar (sem ns = minecraft)."""
+        namespace, _, path = reference.rpartition(':')
+        return f"assets/{namespace or 'minecraft'}/{folder}/{path}{extension}"
+
+    def _extract_tags(self, jar: zipfile.ZipFile) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Extrai as definições de tags de blocos e itens (data/<ns>/tags/...), de qualquer namespace."""
+        tags = {'blocks': {}, 'items': {}}
+        for file in jar.namelist():
+            parts = file.split('/')
+            if (len(parts) > 4 and
+                    parts[0] == 'data' and
+                    parts[2] == 'tags' and
+                    parts[3] in self.TAG_FOLDERS and
+                    file.endswith('.json')):
+                definition = self._read_json(jar, file)
+                if isinstance(definition, dict):
+                    tag_name = f"{parts[1]}:{'/'.join(parts[4:])[:-len('.json')]}"
+                    tags[self.TAG_FOLDERS[parts[3]]][tag_name] = definition
+        return tags
+
+    def _extract_references(self, jar: zipfile.ZipFile) -> Dict[str, int]:
+        """Conta em quantas receitas e loot tables do jar cada ID é referenciado.
+
+        O arquivo que define o próprio ID (ex.: loot_tables/blocks/<id>.json, o drop do bloco)
+        não conta como referência a ele.
+        """
+        references = Counter()
+        for file in jar.namelist():
+            parts = file.split('/')
+            if (len(parts) > 3 and
+                    parts[0] == 'data' and
+                    parts[2] in self.REFERENCE_FOLDERS and
+                    file.endswith('.json')):
+                document = self._read_json(jar, file)
+                found = set()
+                self._collect_ids(document, found)
+                found.discard(f"{parts[1]}:{parts[-1][:-len('.json')]}")
+                references.update(found)
+        return dict(references)
+
+    def _collect_ids(self, node: Any, found: set, key: Optional[str] = None) -> None:
+        """Percorre um documento JSON recolhendo os valores no formato 'ns:id'."""
+        if isinstance(node, dict):
+            for child_key, value in node.items():
+                self._collect_ids(value, found, child_key)
+        elif isinstance(node, list):
+            for value in node:
+                self._collect_ids(value, found, key)
+        elif isinstance(node, str) and key not in self.NON_REFERENCE_KEYS and self.ID_PATTERN.match(node):
+            found.add(node)
+
+    def extract_kube_references(self, kube_path: str) -> Dict[str, int]:
+        """Conta em quantos scripts e JSONs do KubeJS cada ID aparece."""
+        references = Counter()
+        for root, _, files in os.walk(kube_path):
+            for file in files:
+                if not file.endswith(('.js', '.json')):
+                    continue
+                try:
+                    with open(os.path.join(root, file), 'r', encoding='utf-8') as f:
+                        content = f.read()
+                except (OSError, UnicodeDecodeError):
+                    continue
+                references.update(set(self.QUOTED_ID_PATTERN.findall(content)))
+        return dict(references)
+
     def _extract_items(self, jar: zipfile.ZipFile, modid: str) -> List[Dict[str, Any]]:
         """Extrai informações sobre itens do mod."""
         items = []
@@ -230,6 +408,45 @@ class ModPackProcessor:
         
         return mods
 
+    def build_texture_index(self, mods_list: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Monta o índice de assinaturas visuais de todos os blocos, indexado pelo ID completo."""
+        index = {}
+        for mod in mods_list:
+            for block_id, signature in mod.get('textures', {}).items():
+                index[f"{mod['modid']}:{block_id}"] = signature
+        return index
+
+    def build_tag_index(self, mods_list: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Mescla as tags de todos os mods do pack e gera os bitsets de blocos e itens."""
+        index = {}
+        for registry in ('blocks', 'items'):
+            definitions = {}
+            for mod in mods_list:
+                TagIndex.merge_definitions(definitions, mod.get('tags', {}).get(registry, {}))
+            index[registry] = TagIndex.build(definitions)
+        return index
+
+    def build_reference_counts(self, mods_list: List[Dict[str, Any]], kube_path: Optional[str] = None) -> Dict[str, int]:
+        """Soma as referências de todos os mods do pack (e do KubeJS, se informado)."""
+        references = Counter()
+        for mod in mods_list:
+            references.update(mod.get('references', {}))
+        if kube_path and os.path.isdir(kube_path):
+            references.update(self.extractor.extract_kube_references(kube_path))
+        return dict(references)
+
+    def build_state_schemas(self, mods_list: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Monta a tabela de esquemas de propriedades internados de todos os blocos do pack."""
+        schemas = BlockStateSchemas()
+        for mod in mods_list:
+            for block in mod['blocks']:
+                schemas.intern(
+                    f"{mod['modid']}:{block['id']}",
+                    block.get('variant_info', {}),
+                    block.get('blockstate_format', 'variants')
+                )
+        return schemas.to_dict()
+
     def split_mods_data(self, mods_list: List[Dict[str, Any]]) -> Tuple[Dict, Dict, Dict]:
         """Separa os dados de blocos, itens e entidades em listas distintas."""
         blocks, items, entities = {}, {}, {}
@@ -247,14 +464,25 @@ class ModPackProcessor:
         return blocks, items, entities
 
     def process_modpack(self, mods_folder: str, output_base: str, output_files: Dict[str, str], 
-                        client_path: Optional[str] = None) -> None:
-        """Processa um pacote de mods completo, opcionalmente incluindo o client."""
+                        client_path: Optional[str] = None, kube_path: Optional[str] = None) -> Dict[str, Any]:
+        """Processa um pacote de mods completo, opcionalmente incluindo o client e o KubeJS.
+
+        Além de salvar os arquivos, retorna o catálogo em memória (mesmas chaves de `output_files`).
+        """
         mods_list = self.generate_mods_list(mods_folder, client_path)
         blocks, items, entities = self.split_mods_data(mods_list)
+        textures = self.build_texture_index(mods_list)
+        tags = self.build_tag_index(mods_list)
+        references = self.build_reference_counts(mods_list, kube_path)
+        states = self.build_state_schemas(mods_list)
 
         save_file(output_base, blocks, output_files['blocks'])
         save_file(output_base, items, output_files['items'])
         save_file(output_base, entities, output_files['entities'])
+        save_file(output_base, textures, output_files['textures'])
+        save_file(output_base, tags, output_files['tags'])
+        save_file(output_base, references, output_files['references'])
+        save_file(output_base, states, output_files['states'])
 
         print(f"\nProcesso concluído para {mods_folder}. Arquivos gerados:")
         for name, path in output_files.items():
@@ -262,6 +490,18 @@ class ModPackProcessor:
         
         if client_path:
             print(f"(Incluído conteúdo do client: {client_path})")
+        if kube_path:
+            print(f"(Incluídas referências do KubeJS: {kube_path})")
+
+        return {
+            'blocks': blocks,
+            'items': items,
+            'entities': entities,
+            'textures': textures,
+            'tags': tags,
+            'references': references,
+            'states': states
+        }
 
 
 def main():
@@ -277,9 +517,14 @@ def main():
         output_files={
             'blocks': Output.RC_BLOCKS,
             'items': Output.RC_ITEMS,
-            'entities': Output.RC_ENTITIES
+            'entities': Output.RC_ENTITIES,
+            'textures': Output.RC_TEXTURES,
+            'tags': Output.RC_TAGS,
+            'references': Output.RC_REFERENCES,
+            'states': Output.RC_STATES
         },
-        client_path=Clients.FINAL  # Assumindo que RC_KUBE aponta para o client.jar
+        client_path=Clients.FINAL,
+        kube_path=Folders.RC_KUBE
     )
 
     # Processa o segundo pack (DC) sem o client
@@ -289,7 +534,11 @@ def main():
         output_files={
             'blocks': Output.DC_BLOCKS,
             'items': Output.DC_ITEMS,
-            'entities': Output.DC_ENTITIES
+            'entities': Output.DC_ENTITIES,
+            'textures': Output.DC_TEXTURES,
+            'tags': Output.DC_TAGS,
+            'references': Output.DC_REFERENCES,
+            'states': Output.DC_STATES
         },
         client_path=Clients.ORIGINAL
     )
@@ -0,0 +1,129 @@
+from collections import defaultdict
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+
+Rule = Tuple[str, str, Tuple[str, ...], Tuple[str, ...]]
+
+
+class ReplacementRuleMiner:
+    """Classe responsável por aprender regras de substituição a partir das correlações aceitas.
+
+    Cada regra é uma tupla (modid_origem, modid_destino, tokens_antigos, tokens_novos),
+    onde os tokens vêm do ID do bloco separado por '_'. Tokens vazios nos dois lados
+    representam uma simples mudança de namespace (ex.: biomesoplenty:mud -> minecraft:mud).
+    """
+
+    def __init__(self, min_support: int = 2):
+        self.min_support = min_support
+        self.rules: Dict[Rule, List[str]] = {}
+
+    @staticmethod
+    def _split_full_id(full_id: str) -> Tuple[str, str]:
+        """Separa um ID completo em (modid, block_id)."""
+        modid, _, block_id = full_id.partition(':')
+        return modid, block_id
+
+    def _derive_rule(self, missing_id: str, replacement_id: str) -> Optional[Rule]:
+        """Deriva a regra de substituição de um único mapeamento, se houver uma."""
+        src_ns, src_id = self._split_full_id(missing_id)
+        dst_ns, dst_id = self._split_full_id(replacement_id)
+        src_tokens = src_id.split('_')
+        dst_tokens = dst_id.split('_')
+
+        # Remove os tokens comuns no início e no fim, sobrando apenas o trecho alterado
+        prefix = 0
+        while (prefix < min(len(src_tokens), len(dst_tokens)) and
+               src_tokens[prefix] == dst_tokens[prefix]):
+            prefix += 1
+        suffix = 0
+        while (suffix < min(len(src_tokens), len(dst_tokens)) - prefix and
+               src_tokens[-1 - suffix] == dst_tokens[-1 - suffix]):
+            suffix += 1
+
+        old = tuple(src_tokens[prefix:len(src_tokens) - suffix])
+        new = tuple(dst_tokens[prefix:len(dst_tokens) - suffix])
+
+        if not old and not new and src_ns == dst_ns:
+            return None
+        if not old and new:
+            # Inserções puras não têm âncora para serem aplicadas em outros blocos
+            return None
+        # Renomeações de um único bloco inteiro não generalizam
+        if prefix == 0 and suffix == 0:
+            return None
+        return src_ns, dst_ns, old, new
+
+    def mine(self, mapping: Dict[str, str]) -> Dict[Rule, List[str]]:
+        """Aprende as regras a partir do mapeamento aceito, mantendo apenas as com suporte suficiente."""
+        support = defaultdict(list)
+        for missing_id, replacement_id in mapping.items():
+            rule = self._derive_rule(missing_id, replacement_id)
+            if rule is not None:
+                support[rule].append(missing_id)
+
+        self.rules = {
+            rule: examples for rule, examples in support.items()
+            if len(examples) >= self.min_support
+        }
+        return self.rules
+
+    def _build_index(self, missing_blocks: Iterable[Dict[str, Any]]) -> Dict[Tuple[str, str], List[List[str]]]:
+        """Indexa os blocos faltantes por (modid, token) para aplicar as regras numa única passada."""
+        index = defaultdict(list)
+        for block in missing_blocks:
+            tokens = block['id'].split('_')
+            index[(block['modid'], '')].append(tokens)
+            for token in set(tokens):
+                index[(block['modid'], token)].append(tokens)
+        return index
+
+    @staticmethod
+    def _apply_rule(tokens: List[str], old: Tuple[str, ...], new: Tuple[str, ...]) -> Optional[List[str]]:
+        """Aplica a substituição de tokens na primeira ocorrência encontrada."""
+        if not old:
+            return list(tokens)
+        size = len(old)
+        for start in range(len(tokens) - size + 1):
+            if tuple(tokens[start:start + size]) == old:
+                return tokens[:start] + list(new) + tokens[start + size:]
+        return None
+
+    def suggest(self, missing_blocks: List[Dict[str, Any]], existing_ids: set) -> Dict[str, Dict[str, Any]]:
+        """Aplica as regras aprendidas a todos os blocos faltantes e retorna as sugestões válidas.
+
+        Quando mais de uma regra se aplica ao mesmo bloco, vence a de maior suporte.
+        """
+        index = self._build_index(missing_blocks)
+        suggestions = {}
+
+        for rule, examples in self.rules.items():
+            src_ns, dst_ns, old, new = rule
+            anchor = old[0] if old else ''
+            for tokens in index.get((src_ns, anchor), []):
+                replaced = self._apply_rule(tokens, old, new)
+                if not replaced:
+                    continue
+                candidate = f"{dst_ns}:{'_'.join(replaced)}"
+                if candidate not in existing_ids:
+                    continue
+
+                missing_id = f"{src_ns}:{'_'.join(tokens)}"
+                current = suggestions.get(missing_id)
+                if current is None or current['support'] < len(examples):
+                    suggestions[missing_id] = {
+                        'replacement': candidate,
+                        'rule': rule,
+                        'support': len(examples)
+                    }
+
+        return suggestions
+
+    @staticmethod
+    def describe_rule(rule: Rule) -> str:
+        """Gera uma descrição legível da regra."""
+        src_ns, dst_ns, old, new = rule
+        if not old and not new:
+            return f"{src_ns}:* -> {dst_ns}:*"
+        old_text = '_'.join(old) or '(vazio)'
+        new_text = '_'.join(new) or '(vazio)'
+        return f"{src_ns}:*{old_text}* -> {dst_ns}:*{new_text}*"
@@ -0,0 +1,98 @@
+from typing import Dict, List, Any, Optional, Set
+
+
+class TagIndex:
+    """Índice de tags de um pack, com a participação de cada elemento guardada como bitset (int).
+
+    O formato serializado é {'tags': [nomes], 'members': {'modid:id': [índices]}}, onde cada
+    índice i indica participação na tag tags[i]. O bitset só é montado em memória, já que
+    inteiros grandes ocupam muito mais espaço em JSON e passam do limite de dígitos do Python.
+    """
+
+    def __init__(self, data: Optional[Dict[str, Any]] = None):
+        data = data or {}
+        self.tags: List[str] = data.get('tags', [])
+        self.indices: Dict[str, List[int]] = data.get('members', {})
+        self.members: Dict[str, int] = {}
+        for full_id, indices in self.indices.items():
+            mask = 0
+            for bit in indices:
+                mask |= 1 << bit
+            self.members[full_id] = mask
+        self.positions = {name: bit for bit, name in enumerate(self.tags)}
+
+    @staticmethod
+    def merge_definitions(target: Dict[str, List[Any]], definitions: Dict[str, Dict[str, Any]]) -> None:
+        """Mescla definições de tags de um jar nas já coletadas, respeitando 'replace'."""
+        for name, definition in definitions.items():
+            if definition.get('replace', False) or name not in target:
+                target[name] = []
+            target[name].extend(definition.get('values', []))
+
+    @classmethod
+    def build(cls, definitions: Dict[str, List[Any]]) -> Dict[str, Any]:
+        """Resolve as tags (incluindo referências '#tag' aninhadas) e gera o formato serializado."""
+        resolved: Dict[str, Set[str]] = {}
+
+        def resolve(name: str, visiting: Set[str]) -> Set[str]:
+            if name in resolved:
+                return resolved[name]
+            if name in visiting:
+                return set()
+            visiting.add(name)
+            members = set()
+            for value in definitions.get(name, []):
+                if isinstance(value, dict):
+                    value = value.get('id', '')
+                if not isinstance(value, str) or not value:
+                    continue
+                if value.startswith('#'):
+                    members |= resolve(value[1:], visiting)
+                else:
+                    members.add(value if ':' in value else f"minecraft:{value}")
+            visiting.discard(name)
+            resolved[name] = members
+            return members
+
+        tags = sorted(definitions.keys())
+        members: Dict[str, List[int]] = {}
+        for bit, name in enumerate(tags):
+            for element_id in resolve(name, set()):
+                members.setdefault(element_id, []).append(bit)
+
+        return {'tags': tags, 'members': members}
+
+    @staticmethod
+    def bits(mask: int) -> List[int]:
+        """Posições dos bits ligados num bitset, visitando apenas os bits ligados."""
+        bits = []
+        while mask:
+            low = mask & -mask
+            bits.append(low.bit_length() - 1)
+            mask ^= low
+        return bits
+
+    def mask(self, full_id: str) -> int:
+        """Bitset das tags de um elemento (0 se não pertencer a nenhuma)."""
+        return self.members.get(full_id, 0)
+
+    def names(self, mask: int) -> List[str]:
+        """Nomes das tags presentes num bitset."""
+        return [self.tags[bit] for bit in self.bits(mask)]
+
+    def translate(self, mask: int, other: 'TagIndex') -> int:
+        """Converte um bitset deste índice para as posições de bits de outro índice."""
+        translated = 0
+        for name in self.names(mask):
+            bit = other.positions.get(name)
+            if bit is not None:
+                translated |= 1 << bit
+        return translated
+
+    def postings(self, keys: List[str]) -> Dict[int, List[int]]:
+        """Lista invertida: para cada bit, as posições (em `keys`) dos elementos que têm a tag."""
+        postings: Dict[int, List[int]] = {}
+        for position, key in enumerate(keys):
+            for bit in self.indices.get(key, []):
+                postings.setdefault(bit, []).append(position)
+        return postings
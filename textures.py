@@ -0,0 +1,94 @@
+import io
+from typing import Dict, List, Any, Optional
+import numpy as np
+from PIL import Image
+
+
+class TextureHasher:
+    """Classe responsável por reduzir texturas a assinaturas visuais compactas."""
+
+    HASH_SIZE = 8
+    HIST_LEVELS = 4
+
+    def signature(self, png_bytes: bytes) -> Optional[Dict[str, Any]]:
+        """Calcula o hash perceptual (dHash de 64 bits) e o histograma de cores de uma textura."""
+        try:
+            image = Image.open(io.BytesIO(png_bytes)).convert('RGBA')
+        except Exception:
+            return None
+
+        # Texturas animadas são faixas verticais de quadros; usa apenas o primeiro
+        width, height = image.size
+        if height > width:
+            image = image.crop((0, 0, width, width))
+
+        return {
+            'hash': f"{self._dhash(image):016x}",
+            'hist': self._color_histogram(image)
+        }
+
+    def _dhash(self, image: Image.Image) -> int:
+        """Hash de diferença: compara cada pixel com o vizinho da direita numa versão reduzida."""
+        gray = image.convert('L').resize((self.HASH_SIZE + 1, self.HASH_SIZE), Image.BILINEAR)
+        pixels = np.asarray(gray, dtype=np.int16)
+        bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+        return int(np.packbits(bits).view('>u8')[0])
+
+    def _color_histogram(self, image: Image.Image) -> List[int]:
+        """Histograma RGB quantizado dos pixels visíveis, normalizado para 0-255."""
+        pixels = np.asarray(image, dtype=np.uint16).reshape(-1, 4)
+        pixels = pixels[pixels[:, 3] > 0]
+        bins = self.HIST_LEVELS ** 3
+        if len(pixels) == 0:
+            return [0] * bins
+
+        quantized = pixels[:, :3] * self.HIST_LEVELS // 256
+        codes = (quantized[:, 0] * self.HIST_LEVELS + quantized[:, 1]) * self.HIST_LEVELS + quantized[:, 2]
+        hist = np.bincount(codes, minlength=bins).astype(np.float64)
+        hist = np.round(hist / hist.sum() * 255)
+        return hist.astype(int).tolist()
+
+
+class TextureIndex:
+    """Índice de assinaturas visuais para comparação vetorizada contra todos os blocos de um pack."""
+
+    # Tabela de contagem de bits por byte, usada no cálculo da distância de Hamming
+    _POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def __init__(self, signatures: Optional[Dict[str, Dict[str, Any]]] = None, keys: Optional[List[str]] = None):
+        """Monta o índice. Se `keys` for informado, as linhas seguem essa ordem (sem assinatura = linha vazia)."""
+        signatures = signatures or {}
+        self.signatures = signatures
+        self.keys = keys if keys is not None else list(signatures.keys())
+        self.positions = {key: i for i, key in enumerate(self.keys)}
+
+        count = len(self.keys)
+        bins = TextureHasher.HIST_LEVELS ** 3
+        self.hashes = np.zeros(count, dtype=np.uint64)
+        self.hists = np.zeros((count, bins), dtype=np.float32)
+        self.present = np.zeros(count, dtype=bool)
+
+        for i, key in enumerate(self.keys):
+            signature = signatures.get(key)
+            if signature:
+                self.hashes[i] = int(signature['hash'], 16)
+                self.hists[i] = signature['hist']
+                self.present[i] = True
+        self.hists /= 255.0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Retorna a assinatura de um bloco, se existir."""
+        return self.signatures.get(key)
+
+    def hamming_distances(self, hash_hex: str) -> np.ndarray:
+        """Distância de Hamming entre o hash informado e todos os hashes do índice."""
+        xored = np.bitwise_xor(self.hashes, np.uint64(int(hash_hex, 16)))
+        return self._POPCOUNT[xored.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+    def similarity(self, signature: Dict[str, Any]) -> np.ndarray:
+        """Similaridade visual (0 a 1) contra todas as linhas; linhas sem textura recebem 0."""
+        hash_similarity = 1.0 - self.hamming_distances(signature['hash']) / 64.0
+        hist = np.asarray(signature['hist'], dtype=np.float32) / 255.0
+        hist_similarity = np.minimum(self.hists, hist).sum(axis=1).clip(0.0, 1.0)
+        scores = 0.5 * hash_similarity + 0.5 * hist_similarity
+        return np.where(self.present, scores, 0.0)
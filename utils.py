@@ -25,13 +25,23 @@ def read_config(config_path):
         DC_ITEMS = config['OUTPUT'].get('origin_pack_items'),
         RC_ENTITIES = config['OUTPUT'].get('final_pack_entities'),
         DC_ENTITIES = config['OUTPUT'].get('origin_pack_entities'),
+        RC_TEXTURES = config['OUTPUT'].get('final_pack_textures'),
+        DC_TEXTURES = config['OUTPUT'].get('origin_pack_textures'),
+        RC_TAGS = config['OUTPUT'].get('final_pack_tags'),
+        DC_TAGS = config['OUTPUT'].get('origin_pack_tags'),
+        RC_REFERENCES = config['OUTPUT'].get('final_pack_references'),
+        DC_REFERENCES = config['OUTPUT'].get('origin_pack_references'),
+        RC_STATES = config['OUTPUT'].get('final_pack_states'),
+        DC_STATES = config['OUTPUT'].get('origin_pack_states'),
         BLOCK_REQ = config['OUTPUT'].get('modpack_block_req'),
         ITEM_REQ = config['OUTPUT'].get('modpack_item_req'),
         ENTITIES_REQ = config['OUTPUT'].get('modpack_entity_req'),
         MISSING_BLOCKS = config['OUTPUT'].get('missing_blocks'),
         MISSING_ITEMS = config['OUTPUT'].get('missing_items'),
         MISSING_ENTITIES = config['OUTPUT'].get('missing_entities'),
+        MISSING_STATES = config['OUTPUT'].get('missing_states'),
         CORRELATIONS = config['OUTPUT'].get('correlations'),
+        PIPELINE_STATE = config['OUTPUT'].get('pipeline_state'),
 
     return  Folders, Output, Clients
 